@@ -0,0 +1,112 @@
+"""
+Нагрузочный тест HTTP API (price_api.py)
+
+Открывает несколько keep-alive соединений и измеряет задержки ответов.
+
+Запуск:
+    python api_load_test.py --url http://127.0.0.1:8080 --concurrency 50 --requests 20000
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/snapshot', '/snapshot?offset=100&limit=50', '/statistics', '/health']
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Optional[str]]:
+    """Читает ответ и возвращает код статуса и ETag"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Сервер закрыл соединение")
+    status = int(status_line.split()[1])
+    length = 0
+    etag = None
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+        elif name.strip().lower() == 'etag':
+            etag = value.strip()
+    if length:
+        await reader.readexactly(length)
+    return status, etag
+
+
+async def _worker(host: str, port: int, paths: List[str], count: int,
+                  use_etag: bool, latencies: List[float], errors: List[int]):
+    """Отправляет count запросов по одному соединению"""
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for i in range(count):
+            path = paths[i % len(paths)]
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if use_etag and path in etags:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            request += "\r\n"
+
+            started = time.perf_counter()
+            writer.write(request.encode('latin-1'))
+            await writer.drain()
+            status, etag = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+
+            if status == 200 and etag:
+                # Повторные запросы отправляются с If-None-Match
+                etags[path] = etag
+            elif status != 304:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(url: str, concurrency: int, total: int, paths: List[str], use_etag: bool):
+    """Запускает тест и выводит статистику задержек"""
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    latencies: List[float] = []
+    errors: List[int] = []
+
+    per_worker = max(1, total // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(host, port, paths, per_worker, use_etag, latencies, errors)
+        for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+
+    print(f"Запросов: {len(latencies)}, ошибок: {len(errors)}, время: {elapsed:.2f} с")
+    print(f"Пропускная способность: {len(latencies) / elapsed:.0f} запросов/с")
+    for percent in (50, 90, 99):
+        print(f"  p{percent}: {_percentile(latencies, percent) * 1000:.2f} мс")
+    print(f"  max: {max(latencies) * 1000:.2f} мс")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Нагрузочный тест API OzonPriceTracker")
+    arg_parser.add_argument('--url', default='http://127.0.0.1:8080')
+    arg_parser.add_argument('--concurrency', type=int, default=50)
+    arg_parser.add_argument('--requests', type=int, default=20000)
+    arg_parser.add_argument('--path', action='append', dest='paths',
+                            help="путь для запросов (можно указать несколько раз)")
+    arg_parser.add_argument('--etag', action='store_true',
+                            help="отправлять If-None-Match после первого ответа")
+    args = arg_parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.requests,
+                    args.paths or DEFAULT_PATHS, args.etag))
+
+
+if __name__ == "__main__":
+    main()
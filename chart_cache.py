@@ -0,0 +1,101 @@
+"""
+Кэш построенных графиков
+
+Для каждого графика хранится отпечаток входных данных (значимые колонки
+и параметры построения). Если отпечаток не изменился и файл графика на
+месте, повторное построение пропускается.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_chart(data: pd.DataFrame, columns: List[str],
+                      params: Optional[Dict] = None) -> str:
+    """Считает отпечаток данных графика по колонкам и параметрам"""
+    present = [column for column in columns if column in data.columns]
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'columns': present, 'params': params or {}},
+                             sort_keys=True, default=str).encode('utf-8'))
+    if present:
+        row_hashes = pd.util.hash_pandas_object(data[present], index=False)
+        digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """Манифест построенных графиков с вытеснением устаревших записей"""
+
+    def __init__(self, directory: str, manifest_name: str = ".chart_cache.json",
+                 max_entries: int = 64):
+        self.directory = directory
+        self.path = os.path.join(directory, manifest_name)
+        self.max_entries = max_entries
+        self.entries = self._load()
+
+    def _load(self) -> Dict:
+        """Читает манифест с диска"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as manifest:
+                entries = json.load(manifest)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать кэш графиков {self.path}: {e}")
+            return {}
+
+    def is_fresh(self, chart_path: str, fingerprint: str) -> bool:
+        """Проверяет, что график с таким отпечатком уже построен"""
+        entry = self.entries.get(chart_path)
+        if not entry or entry.get('fingerprint') != fingerprint:
+            return False
+        try:
+            # Файл мог быть перезаписан в обход кэша
+            if os.path.getmtime(chart_path) != entry.get('mtime'):
+                return False
+        except OSError:
+            return False
+        entry['last_used'] = time.time()
+        return True
+
+    def store(self, chart_path: str, fingerprint: str):
+        """Запоминает отпечаток построенного графика"""
+        self.entries[chart_path] = {
+            'fingerprint': fingerprint,
+            'mtime': os.path.getmtime(chart_path),
+            'last_used': time.time(),
+        }
+
+    def discard(self, chart_path: str):
+        """Удаляет запись о графике"""
+        self.entries.pop(chart_path, None)
+
+    def evict(self):
+        """Удаляет записи без файлов и самые старые записи сверх лимита"""
+        self.entries = {
+            path: entry for path, entry in self.entries.items()
+            if os.path.exists(path)
+        }
+        if len(self.entries) > self.max_entries:
+            recent = sorted(self.entries.items(),
+                            key=lambda item: item[1].get('last_used', 0),
+                            reverse=True)[:self.max_entries]
+            self.entries = dict(recent)
+
+    def save(self):
+        """Атомарно сохраняет манифест на диск"""
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as manifest:
+                json.dump(self.entries, manifest, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш графиков {self.path}: {e}")
@@ -0,0 +1,133 @@
+"""
+Предварительное сокращение данных для графиков
+
+Функции этого модуля сводят большие массивы к небольшому набору чисел
+(бины гистограммы, квантили box plot, индексы топ-N, выборка точек),
+чтобы время построения графика не зависело от размера данных.
+"""
+import numpy as np
+from typing import Dict, Tuple
+
+
+def to_float_array(values) -> np.ndarray:
+    """Преобразует последовательность в массив float без пропусков"""
+    array = np.asarray(values, dtype=float)
+    return array[~np.isnan(array)]
+
+
+def reduce_histogram(values, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Возвращает количества и границы бинов гистограммы"""
+    return np.histogram(to_float_array(values), bins=bins)
+
+
+def reduce_boxplot(values, whis: float = 1.5, max_fliers: int = 200) -> Dict:
+    """
+    Считает статистику box plot в формате Axes.bxp
+
+    Выбросы прореживаются до max_fliers точек равномерно по
+    отсортированному ряду, минимальный и максимальный выброс сохраняются.
+    """
+    array = to_float_array(values)
+    q1, med, q3 = np.percentile(array, [25, 50, 75])
+    iqr = q3 - q1
+    low_limit = q1 - whis * iqr
+    high_limit = q3 + whis * iqr
+
+    inside = array[(array >= low_limit) & (array <= high_limit)]
+    whislo = inside.min() if inside.size else q1
+    whishi = inside.max() if inside.size else q3
+
+    fliers = np.sort(array[(array < low_limit) | (array > high_limit)])
+    if fliers.size > max_fliers:
+        positions = np.linspace(0, fliers.size - 1, max_fliers).round().astype(int)
+        fliers = fliers[positions]
+
+    return {
+        'med': med,
+        'q1': q1,
+        'q3': q3,
+        'whislo': whislo,
+        'whishi': whishi,
+        'fliers': fliers,
+    }
+
+
+def _first_k_by_key(keys: np.ndarray, k: int, boundary: float) -> np.ndarray:
+    """
+    Возвращает индексы k наименьших ключей, упорядоченные по ключу
+
+    boundary - k-й по величине ключ. При равных ключах берутся и
+    упорядочиваются элементы с меньшей позицией, как в nlargest/nsmallest.
+    """
+    below = np.flatnonzero(keys < boundary)
+    ties = np.flatnonzero(keys == boundary)[:k - below.size]
+    candidates = np.concatenate([below, ties])
+    return candidates[np.lexsort((candidates, keys[candidates]))]
+
+
+def top_k_indices(values, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Возвращает индексы k наибольших (или наименьших) значений
+
+    Граница находится одним вызовом partition, сортируются только
+    выбранные k элементов. При равных значениях выбираются и идут первыми
+    элементы с меньшей позицией, как в nlargest/nsmallest (keep='first').
+    """
+    array = np.asarray(values, dtype=float)
+    k = min(k, array.size)
+    if k == 0:
+        return np.array([], dtype=int)
+
+    keys = -array if largest else array
+    boundary = np.partition(keys, k - 1)[k - 1]
+    return _first_k_by_key(keys, k, boundary)
+
+
+def top_and_bottom_k(values, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Возвращает индексы k наибольших и k наименьших значений
+
+    Границы обоих краев находятся одним вызовом partition.
+    """
+    array = np.asarray(values, dtype=float)
+    n = array.size
+    if n <= 2 * k:
+        return top_k_indices(array, k, largest=True), top_k_indices(array, k, largest=False)
+
+    partitioned = np.partition(array, [k - 1, n - k])
+    bottom = _first_k_by_key(array, k, partitioned[k - 1])
+    top = _first_k_by_key(-array, k, -partitioned[n - k])
+    return top, bottom
+
+
+def stratified_sample(x, max_points: int, strata: int = 50,
+                      seed: int = 0) -> np.ndarray:
+    """
+    Возвращает отсортированные индексы стратифицированной выборки
+
+    Точки разбиваются на страты по квантилям x, из каждой страты берется
+    доля точек, пропорциональная ее размеру (но не меньше одной), так что
+    хвосты распределения не теряются. Размер выборки не превышает max_points.
+    """
+    array = np.asarray(x, dtype=float)
+    n = array.size
+    if n <= max_points:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    edges = np.quantile(array, np.linspace(0, 1, strata + 1))
+    labels = np.clip(np.searchsorted(edges, array, side='right') - 1, 0, strata - 1)
+
+    # Случайный порядок внутри каждой страты
+    order = rng.permutation(n)
+    order = order[np.argsort(labels[order], kind='stable')]
+
+    counts = np.bincount(labels, minlength=strata)
+    starts = np.cumsum(counts) - counts
+    quotas = np.ceil(counts * max_points / n).astype(int)
+    rank = np.arange(n) - np.repeat(starts, counts)
+    selected = order[rank < np.repeat(quotas, counts)]
+    if selected.size > max_points:
+        # Квоты округляются вверх, лишние точки отбрасываются случайно
+        selected = rng.choice(selected, max_points, replace=False)
+    return np.sort(selected)
@@ -1,11 +1,15 @@
 """
 Главный файл приложения OzonPriceTracker
 """
+import os
 import sys
 import logging
 from datetime import datetime
 from ozon_parser import OzonParser
 from price_analyzer import PriceAnalyzer
+from price_alerts import AlertEngine, OutboxSink
+
+ALERT_RULES_FILE = "alert_rules.json"
 
 # Настройка логирования
 logging.basicConfig(
@@ -71,6 +75,19 @@ def main():
         parser.save_to_csv(products, csv_filename)
         print(f"✅ Данные сохранены в CSV: {csv_filename}")
         
+        # Проверка правил уведомлений по новым записям
+        if os.path.exists(ALERT_RULES_FILE):
+            try:
+                alert_engine = AlertEngine.from_file(ALERT_RULES_FILE)
+                alerts = alert_engine.evaluate(products)
+                OutboxSink().send(alerts)
+                alert_engine.save_state()
+                if alerts:
+                    print(f"🔔 Сработало уведомлений: {len(alerts)} (см. alerts_outbox.jsonl)")
+            except Exception as e:
+                logger.error(f"Ошибка при проверке уведомлений: {e}")
+                print(f"⚠️  Уведомления не проверены: {e}")
+        
         # Анализ данных и создание графиков
         print("\nСоздаем графики и анализ...")
         
@@ -143,11 +160,13 @@ OZON PRICE TRACKER - Справка
     • Сохранение в Excel и CSV форматах
     • Создание графиков и анализ данных
     • Статистика по ценам и рейтингам
+    • Уведомления о снижении цен (правила в alert_rules.json)
 
 ФАЙЛЫ:
     • ozon_products_YYYYMMDD_HHMMSS.xlsx - данные в Excel
     • ozon_products_YYYYMMDD_HHMMSS.csv - данные в CSV
     • charts/ - папка с графиками
+    • alerts_outbox.jsonl - сработавшие уведомления
     • ozon_tracker.log - файл логов
 
 ТРЕБОВАНИЯ:
@@ -9,6 +9,7 @@ import re
 from urllib.parse import urljoin
 from typing import List, Dict, Optional
 import logging
+from session_pool import SessionPool
 
 # Настройка логирования
 logging.basicConfig(
@@ -17,23 +18,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Колонки сохраняемых файлов
+COLUMNS_ORDER = [
+    'product_id', 'category', 'title', 'current_price', 'old_price',
+    'rating', 'url', 'date_collected'
+]
+
+
+def extract_product_id(url: Optional[str]) -> Optional[str]:
+    """Извлекает числовой идентификатор товара из ссылки Ozon"""
+    # В прочитанных таблицах пропуск ссылки представлен как NaN
+    if not isinstance(url, str) or not url:
+        return None
+    match = re.search(r'/product/(?:[^/?#]*-)?(\d+)/?', url)
+    return match.group(1) if match else None
+
 
 class OzonParser:
     """Класс для парсинга товаров с Ozon"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                          'AppleWebKit/537.36 (KHTML, like Gecko) '
-                          'Chrome/120.0.0.0 Safari/537.36'),
-            'Accept': ('text/html,application/xhtml+xml,application/xml;'
-                      'q=0.9,image/webp,*/*;q=0.8'),
-            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+    def __init__(self, pool_size: int = 4, proxies: Optional[List[str]] = None):
+        # Пул сессий со своими заголовками, cookies и прокси
+        self.pool = SessionPool(size=pool_size, proxies=proxies)
         self.base_url = "https://www.ozon.ru"
         
     def get_category_url(self, category: str) -> str:
@@ -52,6 +58,7 @@ class OzonParser:
             if title_element:
                 product_data['title'] = title_element.get('title', '').strip()
                 product_data['url'] = urljoin(self.base_url, title_element.get('href', ''))
+                product_data['product_id'] = extract_product_id(product_data['url'])
             else:
                 # Альтернативный поиск названия
                 title_element = card_element.find('span', class_='tsBody500Medium')
@@ -111,7 +118,7 @@ class OzonParser:
         """Парсит страницу с товарами"""
         try:
             logger.info(f"Парсинг страницы: {url}")
-            response = self.session.get(url, timeout=10)
+            response = self.pool.get(url, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -153,6 +160,8 @@ class OzonParser:
             
             logger.info(f"Парсинг страницы {page} из {max_pages}")
             products = self.parse_page(url)
+            for product in products:
+                product['category'] = category
             
             if not products:
                 logger.warning(f"На странице {page} не найдено товаров, завершаем парсинг")
@@ -165,6 +174,8 @@ class OzonParser:
             time.sleep(1)
         
         logger.info(f"Всего собрано товаров: {len(all_products)}")
+        for pooled_stats in self.pool.stats():
+            logger.info(f"Состояние сессии: {pooled_stats}")
         return all_products
     
     def save_to_excel(self, products: List[Dict], filename: str = "ozon_products.xlsx"):
@@ -179,8 +190,7 @@ class OzonParser:
         df['date_collected'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
         
         # Переупорядочиваем колонки
-        columns_order = ['title', 'current_price', 'old_price', 'rating', 'url', 'date_collected']
-        df = df.reindex(columns=columns_order)
+        df = df.reindex(columns=COLUMNS_ORDER)
         
         # Сохраняем в Excel
         df.to_excel(filename, index=False, engine='openpyxl')
@@ -197,8 +207,7 @@ class OzonParser:
         df = pd.DataFrame(products)
         df['date_collected'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        columns_order = ['title', 'current_price', 'old_price', 'rating', 'url', 'date_collected']
-        df = df.reindex(columns=columns_order)
+        df = df.reindex(columns=COLUMNS_ORDER)
         
         df.to_csv(filename, index=False, encoding='utf-8-sig')
         logger.info(f"Данные сохранены в файл: {filename}")
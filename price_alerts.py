@@ -0,0 +1,264 @@
+"""
+Правила уведомлений о ценах
+
+Правила индексируются по идентификатору товара и категории, поэтому
+после каждого сбора проверяются только что полученные записи,
+без просмотра всей истории. Для правила «исторический минимум» хранится
+минимальная цена каждого товара в небольшом файле состояния.
+
+Формат файла правил (JSON):
+    [
+        {"rule_id": "cheap-laptop", "kind": "price_below", "threshold": 50000,
+         "category": "ноутбуки"},
+        {"rule_id": "phone-low", "kind": "all_time_low", "product_id": "123456789"},
+        {"rule_id": "big-sale", "kind": "discount_above", "threshold": 40}
+    ]
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RULE_KINDS = ('price_below', 'all_time_low', 'discount_above')
+
+
+@dataclass
+class AlertRule:
+    """Правило уведомления
+
+    Правило задается либо для товара (product_id), либо для категории
+    (category); правило без них применяется ко всем товарам.
+    """
+    rule_id: str
+    kind: str
+    threshold: Optional[float] = None
+    product_id: Optional[str] = None
+    category: Optional[str] = None
+
+    def __post_init__(self):
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"Неизвестный тип правила: {self.kind}")
+        if self.kind != 'all_time_low' and self.threshold is None:
+            raise ValueError(f"Для правила {self.rule_id} не задан порог")
+        if self.threshold is not None:
+            try:
+                self.threshold = float(self.threshold)
+            except (TypeError, ValueError):
+                raise ValueError(f"Некорректный порог правила {self.rule_id}: {self.threshold!r}")
+        if self.product_id is not None and self.category is not None:
+            raise ValueError(f"Правило {self.rule_id} задано одновременно для товара и категории")
+        if self.product_id is not None:
+            self.product_id = str(self.product_id)
+
+
+class AlertEngine:
+    """Проверяет правила по записям очередного сбора"""
+
+    def __init__(self, rules: Iterable[AlertRule] = (),
+                 state_path: Optional[str] = "price_alerts_state.json"):
+        self.state_path = state_path
+        self.by_product: Dict[str, List[AlertRule]] = {}
+        self.by_category: Dict[str, List[AlertRule]] = {}
+        self.global_rules: List[AlertRule] = []
+        self.rule_ids: set = set()
+        for rule in rules:
+            self.add_rule(rule)
+
+        # Минимальная цена каждого товара и сработавшие пары (правило, товар)
+        self.min_prices: Dict[str, float] = {}
+        self.active: set = set()
+        self._load_state()
+
+    @classmethod
+    def from_file(cls, rules_path: str, **kwargs) -> 'AlertEngine':
+        """Создает движок по JSON-файлу с правилами"""
+        with open(rules_path, encoding='utf-8') as rules_file:
+            rules = [AlertRule(**rule) for rule in json.load(rules_file)]
+        logger.info(f"Загружено правил уведомлений: {len(rules)}")
+        return cls(rules, **kwargs)
+
+    def add_rule(self, rule: AlertRule):
+        """Добавляет правило в индекс"""
+        self.rule_ids.add(rule.rule_id)
+        if rule.product_id is not None:
+            self.by_product.setdefault(rule.product_id, []).append(rule)
+        elif rule.category is not None:
+            self.by_category.setdefault(rule.category, []).append(rule)
+        else:
+            self.global_rules.append(rule)
+
+    def _load_state(self):
+        """Читает состояние предыдущих сборов"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            self.min_prices = state.get('min_prices', {})
+            self.active = {tuple(pair) for pair in state.get('active', [])}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать состояние уведомлений {self.state_path}: {e}")
+
+    def save_state(self):
+        """Атомарно сохраняет состояние на диск"""
+        if not self.state_path:
+            return
+        # Сработавшие пары удаленных из файла правил больше не нужны
+        self.active = {pair for pair in self.active if pair[0] in self.rule_ids}
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as state_file:
+            json.dump({
+                'min_prices': self.min_prices,
+                'active': sorted(list(pair) for pair in self.active),
+            }, state_file, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+
+    def _rules_for(self, product: Dict) -> List[AlertRule]:
+        """Возвращает правила, относящиеся к товару"""
+        rules = list(self.global_rules)
+        product_id = product.get('product_id')
+        if product_id is not None:
+            rules.extend(self.by_product.get(str(product_id), ()))
+        category = product.get('category')
+        if category is not None:
+            rules.extend(self.by_category.get(category, ()))
+        return rules
+
+    @staticmethod
+    def _matches(rule: AlertRule, product: Dict, previous_min: Optional[float]) -> bool:
+        """Проверяет условие правила для записи"""
+        price = product.get('current_price')
+        if price is None:
+            return False
+        if rule.kind == 'price_below':
+            return price < rule.threshold
+        if rule.kind == 'all_time_low':
+            return previous_min is not None and price < previous_min
+        old_price = product.get('old_price')
+        if not old_price or old_price <= price:
+            return False
+        return (old_price - price) / old_price * 100 > rule.threshold
+
+    def evaluate(self, products: Iterable[Dict]) -> List[Dict]:
+        """
+        Проверяет правила по новым записям и возвращает уведомления
+
+        Уведомление отправляется один раз при переходе условия в истинное
+        состояние и повторяется, только если условие сначала перестанет
+        выполняться.
+        """
+        alerts = []
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        for product in products:
+            product_id = product.get('product_id')
+            if product_id is None:
+                continue
+            product_id = str(product_id)
+            previous_min = self.min_prices.get(product_id)
+
+            for rule in self._rules_for(product):
+                key = (rule.rule_id, product_id)
+                if not self._matches(rule, product, previous_min):
+                    self.active.discard(key)
+                    continue
+                # Исторический минимум срабатывает на каждом новом минимуме
+                if key in self.active and rule.kind != 'all_time_low':
+                    continue
+                self.active.add(key)
+                alerts.append({
+                    'rule_id': rule.rule_id,
+                    'kind': rule.kind,
+                    'threshold': rule.threshold,
+                    'product_id': product_id,
+                    'category': product.get('category'),
+                    'title': product.get('title'),
+                    'url': product.get('url'),
+                    'current_price': product.get('current_price'),
+                    'old_price': product.get('old_price'),
+                    'previous_min_price': previous_min,
+                    'rating': product.get('rating'),
+                    'triggered_at': timestamp,
+                })
+
+            price = product.get('current_price')
+            if price is not None and (previous_min is None or price < previous_min):
+                self.min_prices[product_id] = price
+
+        logger.info(f"Сработало уведомлений: {len(alerts)}")
+        return alerts
+
+
+class OutboxSink:
+    """Записывает уведомления в файл JSON Lines"""
+
+    def __init__(self, path: str = "alerts_outbox.jsonl"):
+        self.path = path
+
+    def send(self, alerts: List[Dict]):
+        if not alerts:
+            return
+        with open(self.path, 'a', encoding='utf-8') as outbox:
+            for alert in alerts:
+                outbox.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        logger.info(f"Уведомления записаны в {self.path}: {len(alerts)}")
+
+
+class WebhookSink:
+    """Отправляет уведомления POST-запросами на webhook
+
+    Уведомления сначала записываются в очередь JSON Lines на диске и
+    удаляются из нее только после успешной доставки, поэтому при
+    недоступности webhook они повторяются при следующем вызове send,
+    в том числе в следующем запуске.
+    """
+
+    def __init__(self, url: str, queue_path: str = "alerts_webhook_queue.jsonl",
+                 timeout: float = 5.0):
+        self.url = url
+        self.queue_path = queue_path
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.pending: List[Dict] = self._load_queue()
+
+    def _load_queue(self) -> List[Dict]:
+        """Читает неотправленные уведомления"""
+        if not os.path.exists(self.queue_path):
+            return []
+        with open(self.queue_path, encoding='utf-8') as queue:
+            return [json.loads(line) for line in queue if line.strip()]
+
+    def _save_queue(self):
+        """Атомарно перезаписывает очередь неотправленных уведомлений"""
+        temp_path = f"{self.queue_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as queue:
+            for alert in self.pending:
+                queue.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.queue_path)
+
+    def send(self, alerts: List[Dict]):
+        self.pending.extend(alerts)
+        if not self.pending:
+            return
+        self._save_queue()
+
+        delivered = 0
+        for alert in self.pending:
+            try:
+                response = self.session.post(self.url, json=alert, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.error(f"Ошибка при отправке уведомления на {self.url}: {e}")
+                break
+            delivered += 1
+
+        self.pending = self.pending[delivered:]
+        self._save_queue()
+        if self.pending:
+            logger.warning(f"В очереди webhook осталось уведомлений: {len(self.pending)}")
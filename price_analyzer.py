@@ -2,10 +2,16 @@
 Анализатор цен и создатель графиков для данных Ozon
 """
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import os
 from typing import List, Dict, Optional
 import logging
+from chart_reduction import (
+    reduce_histogram, reduce_boxplot, top_k_indices, top_and_bottom_k,
+    stratified_sample
+)
+from chart_cache import ChartCache, fingerprint_chart
 
 # Настройка для корректного отображения русского текста
 plt.rcParams['font.family'] = [
@@ -15,17 +21,81 @@ plt.rcParams['axes.unicode_minus'] = False
 
 logger = logging.getLogger(__name__)
 
+# Версия оформления графиков: увеличивается при изменении кода построения,
+# чтобы кэш не отдавал графики, построенные старой версией
+CHART_VERSION = 1
+
+
+def basic_statistics(data: Optional[pd.DataFrame]) -> Dict:
+    """Возвращает базовую статистику по ценам для таблицы товаров"""
+    if data is None or data.empty:
+        return {}
+    
+    stats = {}
+    
+    # Статистика по текущим ценам
+    if 'current_price' in data.columns:
+        current_prices = data['current_price'].dropna()
+        if not current_prices.empty:
+            stats['current_price'] = {
+                'count': len(current_prices),
+                'mean': current_prices.mean(),
+                'median': current_prices.median(),
+                'min': current_prices.min(),
+                'max': current_prices.max(),
+                'std': current_prices.std()
+            }
+    
+    # Статистика по старым ценам (скидки)
+    if 'old_price' in data.columns:
+        old_prices = data['old_price'].dropna()
+        if not old_prices.empty:
+            stats['old_price'] = {
+                'count': len(old_prices),
+                'mean': old_prices.mean(),
+                'median': old_prices.median(),
+                'min': old_prices.min(),
+                'max': old_prices.max(),
+                'std': old_prices.std()
+            }
+    
+    # Статистика по рейтингам
+    if 'rating' in data.columns:
+        ratings = data['rating'].dropna()
+        if not ratings.empty:
+            stats['rating'] = {
+                'count': len(ratings),
+                'mean': ratings.mean(),
+                'median': ratings.median(),
+                'min': ratings.min(),
+                'max': ratings.max(),
+                'std': ratings.std()
+            }
+    
+    return stats
+
 
 class PriceAnalyzer:
     """Класс для анализа цен и создания графиков"""
     
-    def __init__(self):
+    def __init__(self, scatter_threshold: int = 50000, scatter_mode: str = 'hexbin',
+                 output_dir: str = "charts"):
         self.data = None
-        self.output_dir = "charts"
+        self.output_dir = output_dir
+        
+        # Порог, выше которого диаграммы рассеяния сокращаются:
+        # 'hexbin' - плотность по шестиугольникам, 'sample' - стратифицированная выборка
+        if scatter_mode not in ('hexbin', 'sample'):
+            raise ValueError("scatter_mode должен быть 'hexbin' или 'sample'")
+        self.scatter_threshold = scatter_threshold
+        self.scatter_mode = scatter_mode
         
         # Создаем папку для графиков
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+        
+        # Манифест уже построенных графиков создается по текущей папке output_dir
+        self._chart_cache = None
     
     def load_data(self, filename: str) -> pd.DataFrame:
         """Загружает данные из Excel или CSV файла"""
@@ -50,51 +120,51 @@ class PriceAnalyzer:
     
     def get_basic_statistics(self) -> Dict:
         """Возвращает базовую статистику по ценам"""
-        if self.data is None or self.data.empty:
-            return {}
-        
-        stats = {}
-        
-        # Статистика по текущим ценам
-        if 'current_price' in self.data.columns:
-            current_prices = self.data['current_price'].dropna()
-            if not current_prices.empty:
-                stats['current_price'] = {
-                    'count': len(current_prices),
-                    'mean': current_prices.mean(),
-                    'median': current_prices.median(),
-                    'min': current_prices.min(),
-                    'max': current_prices.max(),
-                    'std': current_prices.std()
-                }
-        
-        # Статистика по старым ценам (скидки)
-        if 'old_price' in self.data.columns:
-            old_prices = self.data['old_price'].dropna()
-            if not old_prices.empty:
-                stats['old_price'] = {
-                    'count': len(old_prices),
-                    'mean': old_prices.mean(),
-                    'median': old_prices.median(),
-                    'min': old_prices.min(),
-                    'max': old_prices.max(),
-                    'std': old_prices.std()
-                }
-        
-        # Статистика по рейтингам
-        if 'rating' in self.data.columns:
-            ratings = self.data['rating'].dropna()
-            if not ratings.empty:
-                stats['rating'] = {
-                    'count': len(ratings),
-                    'mean': ratings.mean(),
-                    'median': ratings.median(),
-                    'min': ratings.min(),
-                    'max': ratings.max(),
-                    'std': ratings.std()
-                }
-        
-        return stats
+        return basic_statistics(self.data)
+    
+    @property
+    def chart_cache(self) -> ChartCache:
+        """Манифест графиков в текущей папке output_dir"""
+        if self._chart_cache is None or self._chart_cache.directory != self.output_dir:
+            self._chart_cache = ChartCache(self.output_dir)
+        return self._chart_cache
+    
+    def _plot_histogram(self, values, bins: int, **style):
+        """Рисует гистограмму по заранее посчитанным бинам"""
+        counts, edges = reduce_histogram(values, bins)
+        plt.hist(edges[:-1], bins=edges, weights=counts, **style)
+    
+    def _plot_boxplot(self, values):
+        """Рисует box plot по заранее посчитанным квантилям"""
+        plt.gca().bxp([reduce_boxplot(values)])
+    
+    def _plot_scatter(self, x, y, color: str):
+        """Рисует диаграмму рассеяния, сокращая большие наборы точек"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        
+        if len(x) <= self.scatter_threshold:
+            plt.scatter(x, y, alpha=0.6, color=color)
+        elif self.scatter_mode == 'hexbin':
+            plt.hexbin(x, y, gridsize=60, cmap='Purples', mincnt=1)
+            plt.colorbar(label='Количество товаров')
+        else:
+            sample = stratified_sample(x, self.scatter_threshold)
+            plt.scatter(x[sample], y[sample], alpha=0.6, color=color)
+    
+    @staticmethod
+    def _rows_by_positions(frame: pd.DataFrame, column: str, positions) -> pd.DataFrame:
+        """Возвращает строки с непустым значением column по позициям среди них"""
+        values = frame[column].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(values))
+        return frame.iloc[valid[positions]]
+    
+    def _top_rows(self, frame: pd.DataFrame, column: str, k: int = 10,
+                  largest: bool = True) -> pd.DataFrame:
+        """Аналог nlargest/nsmallest на основе одного partition"""
+        values = frame[column].dropna().to_numpy(dtype=float)
+        positions = top_k_indices(values, k, largest=largest)
+        return self._rows_by_positions(frame, column, positions)
     
     def create_price_distribution_chart(self, save_path: Optional[str] = None) -> str:
         """Создает график распределения цен"""
@@ -111,7 +181,7 @@ class PriceAnalyzer:
         
         # Гистограмма распределения цен
         plt.subplot(2, 2, 1)
-        plt.hist(current_prices, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
+        self._plot_histogram(current_prices, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
         plt.title('Распределение цен', fontsize=14, fontweight='bold')
         plt.xlabel('Цена (руб.)')
         plt.ylabel('Количество товаров')
@@ -119,14 +189,18 @@ class PriceAnalyzer:
         
         # Box plot цен
         plt.subplot(2, 2, 2)
-        plt.boxplot(current_prices, vert=True)
+        self._plot_boxplot(current_prices)
         plt.title('Box Plot цен', fontsize=14, fontweight='bold')
         plt.ylabel('Цена (руб.)')
         plt.grid(True, alpha=0.3)
         
+        # Самые дорогие и самые дешевые товары одним проходом
+        top_positions, bottom_positions = top_and_bottom_k(current_prices.to_numpy(dtype=float), 10)
+        
         # Топ-10 самых дорогих товаров
         plt.subplot(2, 2, 3)
-        top_expensive = self.data.nlargest(10, 'current_price')[['title', 'current_price']]
+        top_expensive = self._rows_by_positions(
+            self.data, 'current_price', top_positions)[['title', 'current_price']]
         plt.barh(range(len(top_expensive)), top_expensive['current_price'])
         plt.yticks(range(len(top_expensive)), 
                   [title[:30] + '...' if len(title) > 30 else title 
@@ -136,7 +210,8 @@ class PriceAnalyzer:
         
         # Топ-10 самых дешевых товаров
         plt.subplot(2, 2, 4)
-        top_cheap = self.data.nsmallest(10, 'current_price')[['title', 'current_price']]
+        top_cheap = self._rows_by_positions(
+            self.data, 'current_price', bottom_positions)[['title', 'current_price']]
         plt.barh(range(len(top_cheap)), top_cheap['current_price'])
         plt.yticks(range(len(top_cheap)), 
                   [title[:30] + '...' if len(title) > 30 else title 
@@ -170,7 +245,7 @@ class PriceAnalyzer:
         
         # Распределение рейтингов
         plt.subplot(2, 2, 1)
-        plt.hist(ratings, bins=20, alpha=0.7, color='lightgreen', edgecolor='black')
+        self._plot_histogram(ratings, bins=20, alpha=0.7, color='lightgreen', edgecolor='black')
         plt.title('Распределение рейтингов', fontsize=14, fontweight='bold')
         plt.xlabel('Рейтинг')
         plt.ylabel('Количество товаров')
@@ -178,7 +253,7 @@ class PriceAnalyzer:
         
         # Box plot рейтингов
         plt.subplot(2, 2, 2)
-        plt.boxplot(ratings, vert=True)
+        self._plot_boxplot(ratings)
         plt.title('Box Plot рейтингов', fontsize=14, fontweight='bold')
         plt.ylabel('Рейтинг')
         plt.grid(True, alpha=0.3)
@@ -188,8 +263,8 @@ class PriceAnalyzer:
         if 'current_price' in self.data.columns:
             price_rating_data = self.data[['current_price', 'rating']].dropna()
             if not price_rating_data.empty:
-                plt.scatter(price_rating_data['current_price'], price_rating_data['rating'], 
-                           alpha=0.6, color='purple')
+                self._plot_scatter(price_rating_data['current_price'], price_rating_data['rating'],
+                                   color='purple')
                 plt.title('Корреляция цена-рейтинг', fontsize=14, fontweight='bold')
                 plt.xlabel('Цена (руб.)')
                 plt.ylabel('Рейтинг')
@@ -197,7 +272,7 @@ class PriceAnalyzer:
         
         # Топ товаров по рейтингу
         plt.subplot(2, 2, 4)
-        top_rated = self.data.nlargest(10, 'rating')[['title', 'rating']]
+        top_rated = self._top_rows(self.data, 'rating')[['title', 'rating']]
         plt.barh(range(len(top_rated)), top_rated['rating'], color='gold')
         plt.yticks(range(len(top_rated)), 
                   [title[:30] + '...' if len(title) > 30 else title 
@@ -241,7 +316,8 @@ class PriceAnalyzer:
         
         # Распределение размеров скидок
         plt.subplot(2, 2, 1)
-        plt.hist(discount_data['discount_percent'], bins=20, alpha=0.7, color='orange', edgecolor='black')
+        self._plot_histogram(discount_data['discount_percent'], bins=20,
+                             alpha=0.7, color='orange', edgecolor='black')
         plt.title('Распределение размеров скидок (%)', fontsize=14, fontweight='bold')
         plt.xlabel('Размер скидки (%)')
         plt.ylabel('Количество товаров')
@@ -249,7 +325,7 @@ class PriceAnalyzer:
         
         # Топ скидок по сумме
         plt.subplot(2, 2, 2)
-        top_discounts = discount_data.nlargest(10, 'discount_amount')[['title', 'discount_amount']]
+        top_discounts = self._top_rows(discount_data, 'discount_amount')[['title', 'discount_amount']]
         plt.barh(range(len(top_discounts)), top_discounts['discount_amount'], color='red')
         plt.yticks(range(len(top_discounts)), 
                   [title[:30] + '...' if len(title) > 30 else title 
@@ -259,7 +335,7 @@ class PriceAnalyzer:
         
         # Топ скидок по проценту
         plt.subplot(2, 2, 3)
-        top_discounts_pct = discount_data.nlargest(10, 'discount_percent')[['title', 'discount_percent']]
+        top_discounts_pct = self._top_rows(discount_data, 'discount_percent')[['title', 'discount_percent']]
         plt.barh(range(len(top_discounts_pct)), top_discounts_pct['discount_percent'], color='green')
         plt.yticks(range(len(top_discounts_pct)), 
                   [title[:30] + '...' if len(title) > 30 else title 
@@ -269,8 +345,8 @@ class PriceAnalyzer:
         
         # Корреляция цена-скидка
         plt.subplot(2, 2, 4)
-        plt.scatter(discount_data['current_price'], discount_data['discount_percent'], 
-                   alpha=0.6, color='purple')
+        self._plot_scatter(discount_data['current_price'], discount_data['discount_percent'],
+                           color='purple')
         plt.title('Корреляция цена-скидка', fontsize=14, fontweight='bold')
         plt.xlabel('Текущая цена (руб.)')
         plt.ylabel('Размер скидки (%)')
@@ -339,7 +415,7 @@ class PriceAnalyzer:
         if 'current_price' in self.data.columns:
             current_prices = self.data['current_price'].dropna()
             if not current_prices.empty:
-                plt.hist(current_prices, bins=20, alpha=0.7, color='skyblue', edgecolor='black')
+                self._plot_histogram(current_prices, bins=20, alpha=0.7, color='skyblue', edgecolor='black')
                 plt.title('Распределение цен')
                 plt.xlabel('Цена (руб.)')
                 plt.ylabel('Количество товаров')
@@ -350,7 +426,7 @@ class PriceAnalyzer:
         if 'rating' in self.data.columns:
             ratings = self.data['rating'].dropna()
             if not ratings.empty:
-                plt.hist(ratings, bins=15, alpha=0.7, color='lightgreen', edgecolor='black')
+                self._plot_histogram(ratings, bins=15, alpha=0.7, color='lightgreen', edgecolor='black')
                 plt.title('Распределение рейтингов')
                 plt.xlabel('Рейтинг')
                 plt.ylabel('Количество товаров')
@@ -367,25 +443,61 @@ class PriceAnalyzer:
         logger.info(f"Сводный отчет сохранен: {save_path}")
         return save_path
     
-    def create_all_charts(self) -> List[str]:
-        """Создает все доступные графики"""
+    def create_all_charts(self, use_cache: bool = True) -> List[str]:
+        """
+        Создает все доступные графики
+        
+        Если входные данные графика не изменились с прошлого запуска
+        и файл на месте, график не перестраивается.
+        """
         charts = []
+        os.makedirs(self.output_dir, exist_ok=True)
         
-        # Создаем все графики
+        # Метод, имя файла и колонки, от которых зависит график
         chart_methods = [
-            self.create_price_distribution_chart,
-            self.create_rating_analysis_chart,
-            self.create_discount_analysis_chart,
-            self.create_summary_report
+            (self.create_price_distribution_chart, 'price_distribution.png',
+             ['title', 'current_price']),
+            (self.create_rating_analysis_chart, 'rating_analysis.png',
+             ['title', 'current_price', 'rating']),
+            (self.create_discount_analysis_chart, 'discount_analysis.png',
+             ['title', 'current_price', 'old_price']),
+            (self.create_summary_report, 'summary_report.png',
+             ['current_price', 'old_price', 'rating']),
         ]
-        
-        for method in chart_methods:
+        params = {
+            'chart_version': CHART_VERSION,
+            'scatter_threshold': self.scatter_threshold,
+            'scatter_mode': self.scatter_mode,
+        }
+        skipped = 0
+        
+        for method, filename, columns in chart_methods:
+            save_path = os.path.join(self.output_dir, filename)
             try:
-                chart_path = method()
+                fingerprint = None
+                if self.data is not None:
+                    fingerprint = fingerprint_chart(
+                        self.data, columns, dict(params, chart=method.__name__))
+                # use_cache=False только отключает проверку; отпечаток
+                # перестроенного графика все равно записывается в манифест
+                if use_cache and fingerprint and self.chart_cache.is_fresh(save_path, fingerprint):
+                    charts.append(save_path)
+                    skipped += 1
+                    continue
+                
+                chart_path = method(save_path)
                 if chart_path:
                     charts.append(chart_path)
+                    if fingerprint:
+                        self.chart_cache.store(chart_path, fingerprint)
+                else:
+                    self.chart_cache.discard(save_path)
             except Exception as e:
+                self.chart_cache.discard(save_path)
                 logger.error(f"Ошибка при создании графика {method.__name__}: {e}")
         
-        logger.info(f"Создано графиков: {len(charts)}")
+        self.chart_cache.evict()
+        self.chart_cache.save()
+        
+        logger.info(f"Создано графиков: {len(charts)} (без изменений: {skipped})")
         return charts
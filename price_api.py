@@ -0,0 +1,403 @@
+"""
+HTTP/JSON API только для чтения поверх собранных данных о ценах
+
+Сервер отвечает из индекса в памяти, который перестраивается при
+появлении новых файлов ozon_products_*.csv. Ответы кэшируются до
+следующего обновления индекса и снабжаются ETag.
+
+Запуск:
+    python price_api.py --data-dir . --port 8080
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from ozon_parser import extract_product_id
+from price_analyzer import basic_statistics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_CACHED_RESPONSES = 4096
+
+HTTP_REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+HISTORY_COLUMNS = ['date_collected', 'current_price', 'old_price', 'rating']
+
+
+def _json_default(value):
+    """Преобразует скаляры numpy/pandas для json.dumps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _version(files: Dict[str, float]) -> str:
+    """Считает версию по набору файлов и времени их изменения"""
+    return hashlib.sha1(json.dumps(sorted(files.items())).encode('utf-8')).hexdigest()
+
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """Переводит DataFrame в список словарей, заменяя пропуски на None"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+@dataclass
+class IndexState:
+    """Неизменяемый снимок индекса, подменяемый целиком при обновлении"""
+    version: str = ''
+    files: List[str] = field(default_factory=list)
+    snapshot: List[Dict] = field(default_factory=list)
+    history: Dict[str, List[Dict]] = field(default_factory=dict)
+    statistics: Dict[str, Dict] = field(default_factory=lambda: {'overall': {}, 'categories': {}})
+
+
+class PriceIndex:
+    """Индекс собранных данных в памяти"""
+
+    def __init__(self, data_dir: str = ".", pattern: str = "ozon_products_*.csv"):
+        self.data_dir = data_dir
+        self.pattern = pattern
+        self.state = IndexState()
+        # Уже прочитанные файлы: путь -> (mtime, DataFrame)
+        self._frames: Dict[str, Tuple[float, pd.DataFrame]] = {}
+        # Версия последнего полностью прочитанного набора файлов
+        self._scanned_version = None
+
+    def _scan(self) -> Dict[str, float]:
+        """Возвращает файлы с данными и время их изменения"""
+        files = {}
+        for path in glob.glob(os.path.join(self.data_dir, self.pattern)):
+            try:
+                files[path] = os.path.getmtime(path)
+            except OSError:
+                continue
+        return files
+
+    def _read(self, path: str) -> pd.DataFrame:
+        """Читает файл с данными и дополняет недостающие колонки"""
+        frame = pd.read_csv(path, dtype={'product_id': str})
+        if 'product_id' not in frame.columns:
+            frame['product_id'] = None
+        if 'url' in frame.columns:
+            missing = frame['product_id'].isna()
+            frame.loc[missing, 'product_id'] = frame.loc[missing, 'url'].map(extract_product_id)
+        if 'title' in frame.columns:
+            # Товары без ссылки индексируются по названию
+            missing = frame['product_id'].isna()
+            frame.loc[missing, 'product_id'] = frame.loc[missing, 'title']
+        # Записи, для которых не удалось получить идентификатор, не индексируются
+        usable = frame['product_id'].notna() & (frame['product_id'].astype(str).str.strip() != '')
+        if not usable.all():
+            logger.warning(f"В файле {path} пропущено записей без идентификатора: "
+                           f"{int((~usable).sum())}")
+            frame = frame[usable].copy()
+        frame['product_id'] = frame['product_id'].astype(str)
+        if 'category' not in frame.columns:
+            frame['category'] = None
+        return frame
+
+    def refresh(self) -> bool:
+        """Перестраивает индекс, если набор файлов изменился"""
+        files = self._scan()
+        scanned_version = _version(files)
+        if scanned_version == self._scanned_version:
+            return False
+
+        frames = {}
+        failed = False
+        for path, mtime in files.items():
+            cached = self._frames.get(path)
+            if cached and cached[0] == mtime:
+                frames[path] = cached
+                continue
+            try:
+                frames[path] = (mtime, self._read(path))
+            except Exception as e:
+                failed = True
+                logger.error(f"Ошибка при чтении файла {path}: {e}")
+        self._frames = frames
+        # Непрочитанный файл (например, еще записываемый) читается повторно
+        # при следующей проверке
+        if not failed:
+            self._scanned_version = scanned_version
+
+        version = _version({path: mtime for path, (mtime, _) in frames.items()})
+        if version == self.state.version:
+            return False
+
+        # Имена файлов содержат метку времени, поэтому сортировка по имени
+        # совпадает с хронологическим порядком
+        ordered = sorted(frames)
+        state = IndexState(version=version, files=ordered)
+        if ordered:
+            combined = pd.concat([frames[path][1] for path in ordered], ignore_index=True)
+
+            # Каждый сбор содержит одну категорию, поэтому снимок и статистика
+            # строятся по последней записи каждого товара из всех файлов
+            latest = combined.drop_duplicates('product_id', keep='last')
+            state.snapshot = _records(latest)
+            state.statistics = self._statistics(latest)
+
+            columns = [column for column in HISTORY_COLUMNS if column in combined.columns]
+            # Один проход по всем строкам вместо groupby по каждому товару
+            for product_id, record in zip(combined['product_id'], _records(combined[columns])):
+                state.history.setdefault(product_id, []).append(record)
+
+        self.state = state
+        logger.info(f"Индекс обновлен: файлов {len(ordered)}, "
+                    f"товаров в снимке {len(state.snapshot)}")
+        return True
+
+    @staticmethod
+    def _statistics(frame: pd.DataFrame) -> Dict[str, Dict]:
+        """Считает статистику basic_statistics в целом и по каждой категории"""
+        def describe(group: pd.DataFrame) -> Dict:
+            # NaN (например, std по одному товару) не допускается в JSON
+            return {
+                column: {metric: (None if pd.isna(value) else value)
+                         for metric, value in metrics.items()}
+                for column, metrics in basic_statistics(group).items()
+            }
+
+        return {
+            'overall': describe(frame),
+            'categories': {str(category): describe(group)
+                           for category, group in frame.groupby('category')},
+        }
+
+
+class PriceApiServer:
+    """Асинхронный HTTP-сервер поверх PriceIndex"""
+
+    def __init__(self, index: PriceIndex, host: str = "127.0.0.1", port: int = 8080,
+                 reload_interval: float = 5.0, read_timeout: float = 30.0):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        # Простаивающие keep-alive соединения закрываются по таймауту
+        self.read_timeout = read_timeout
+        self._responses: Dict[Tuple, Tuple[bytes, str]] = {}
+        self._responses_version = None
+        self._server = None
+        self._reload_task = None
+
+    async def start(self):
+        """Строит индекс и начинает принимать соединения"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.index.refresh)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self._reload_task = asyncio.create_task(self._reload_loop())
+        logger.info(f"API запущен на http://{self.host}:{self.port}")
+
+    async def stop(self):
+        """Останавливает сервер и фоновое обновление индекса"""
+        if self._reload_task:
+            self._reload_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        """Запускает сервер и обслуживает запросы до остановки"""
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _reload_loop(self):
+        """Периодически проверяет появление новых данных"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await loop.run_in_executor(None, self.index.refresh)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении индекса: {e}")
+
+    async def _readline(self, reader: asyncio.StreamReader) -> bytes:
+        """Читает строку запроса с ограничением времени ожидания"""
+        return await asyncio.wait_for(reader.readline(), self.read_timeout)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        """Обслуживает соединение с поддержкой keep-alive"""
+        try:
+            while True:
+                request_line = await self._readline(reader)
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, 400, self._error('Некорректный запрос'), close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await self._readline(reader)
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    # Без корректной длины тела нельзя найти начало следующего запроса
+                    await self._write(writer, 400, self._error('Некорректный Content-Length'),
+                                      close=True)
+                    break
+                if length:
+                    await asyncio.wait_for(reader.readexactly(length), self.read_timeout)
+
+                connection = headers.get('connection', '').lower()
+                close = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+
+                if method != 'GET':
+                    await self._write(writer, 405, self._error('Поддерживается только GET'), close=close)
+                else:
+                    try:
+                        status, body, etag = self._respond(target)
+                    except Exception as e:
+                        logger.exception(f"Ошибка при обработке запроса {target}: {e}")
+                        status, body, etag = 500, self._error('Внутренняя ошибка сервера'), None
+                    if status == 200 and etag and etag in headers.get('if-none-match', ''):
+                        await self._write(writer, 304, b'', etag=etag, close=close)
+                    else:
+                        await self._write(writer, status, body, etag=etag, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+                     etag: Optional[str] = None, close: bool = False):
+        """Отправляет HTTP-ответ"""
+        lines = [
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Cache-Control: no-cache",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    @staticmethod
+    def _error(message: str) -> bytes:
+        return json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+
+    def _respond(self, target: str) -> Tuple[int, bytes, Optional[str]]:
+        """Возвращает ответ из кэша или строит его по индексу"""
+        state = self.index.state
+        if self._responses_version != state.version or len(self._responses) > MAX_CACHED_RESPONSES:
+            self._responses = {}
+            self._responses_version = state.version
+
+        parts = urlsplit(target)
+        key = (unquote(parts.path).rstrip('/') or '/', parts.query)
+        cached = self._responses.get(key)
+        if cached:
+            return 200, cached[0], cached[1]
+
+        status, payload = self._route(state, key[0], parse_qs(parts.query))
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+        if status != 200:
+            return status, body, None
+
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self._responses[key] = (body, etag)
+        return status, body, etag
+
+    def _route(self, state: IndexState, path: str, query: Dict) -> Tuple[int, Dict]:
+        """Сопоставляет путь запроса с обработчиком"""
+        try:
+            if path == '/health':
+                return 200, {'status': 'ok', 'version': state.version, 'files': len(state.files)}
+            if path == '/snapshot':
+                return 200, self._paginate(state.snapshot, query)
+            if path.startswith('/products/') and path.endswith('/history'):
+                product_id = path[len('/products/'):-len('/history')]
+                history = state.history.get(product_id)
+                if history is None:
+                    return 404, {'error': f'Товар {product_id} не найден'}
+                page = self._paginate(history, query)
+                page['product_id'] = product_id
+                return 200, page
+            if path == '/statistics':
+                category = query.get('category', [None])[0]
+                if category is None:
+                    return 200, state.statistics
+                categories = state.statistics['categories']
+                if category not in categories:
+                    return 404, {'error': f'Категория {category} не найдена'}
+                return 200, {'category': category, 'statistics': categories[category]}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 404, {'error': f'Неизвестный путь {path}'}
+
+    @staticmethod
+    def _paginate(items: List[Dict], query: Dict) -> Dict:
+        """Возвращает страницу списка по параметрам offset и limit"""
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query.get('limit', [str(DEFAULT_PAGE_SIZE)])[0])
+        except ValueError:
+            raise ValueError('offset и limit должны быть целыми числами')
+        if offset < 0 or limit < 1:
+            raise ValueError('offset должен быть >= 0, limit >= 1')
+        limit = min(limit, MAX_PAGE_SIZE)
+        return {
+            'total': len(items),
+            'offset': offset,
+            'limit': limit,
+            'items': items[offset:offset + limit],
+        }
+
+
+def main():
+    """Запускает API из командной строки"""
+    arg_parser = argparse.ArgumentParser(description="HTTP API для данных OzonPriceTracker")
+    arg_parser.add_argument('--data-dir', default='.', help="папка с файлами ozon_products_*.csv")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--reload-interval', type=float, default=5.0,
+                            help="интервал проверки новых данных, сек.")
+    arg_parser.add_argument('--read-timeout', type=float, default=30.0,
+                            help="время ожидания запроса в открытом соединении, сек.")
+    args = arg_parser.parse_args()
+
+    server = PriceApiServer(PriceIndex(args.data_dir), args.host, args.port,
+                            args.reload_interval, args.read_timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("API остановлен")
+
+
+if __name__ == "__main__":
+    main()
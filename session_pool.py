@@ -0,0 +1,224 @@
+"""
+Пул HTTP-сессий с отслеживанием состояния
+
+Каждая сессия имеет собственные заголовки, cookies и (опционально)
+прокси. Нагрузка распределяется между исправными сессиями: из сессий,
+чья оценка (по задержке и доле ошибок) не хуже заданной доли лучшей,
+берется дольше всех не использовавшаяся. Заблокированные и
+неисправные сессии отправляются на паузу, после которой их
+статистика сбрасывается. Если на паузе все сессии, запрос ждет
+возвращения первой из них.
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'Accept': ('text/html,application/xhtml+xml,application/xml;'
+               'q=0.9,image/webp,*/*;q=0.8'),
+    'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+USER_AGENTS = [
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+     'AppleWebKit/537.36 (KHTML, like Gecko) '
+     'Chrome/120.0.0.0 Safari/537.36'),
+    ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
+     'AppleWebKit/605.1.15 (KHTML, like Gecko) '
+     'Version/17.1 Safari/605.1.15'),
+    ('Mozilla/5.0 (X11; Linux x86_64; rv:121.0) '
+     'Gecko/20100101 Firefox/121.0'),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) '
+     'Gecko/20100101 Firefox/121.0'),
+]
+
+# Коды ответа, означающие блокировку
+BLOCK_STATUSES = (403, 429)
+# Переадресация на страницу проверки и заголовок такой страницы. Проверяется
+# только <title>: ссылки на скрипты вроде recaptcha встречаются и на обычных страницах
+CHALLENGE_PATH = re.compile(r'^/(abt|captcha)(/|$)', re.IGNORECASE)
+CHALLENGE_TITLE = re.compile(r'<title>[^<]*(antibot|доступ ограничен)[^<]*</title>',
+                             re.IGNORECASE)
+
+# Сглаживание скользящих средних задержки и доли ошибок
+EWMA_ALPHA = 0.2
+# Доля от лучшей оценки, начиная с которой сессия участвует в распределении
+SCORE_FLOOR = 0.5
+
+
+@dataclass
+class PooledSession:
+    """Сессия пула и ее статистика"""
+    name: str
+    session: requests.Session
+    proxy: Optional[str] = None
+    latency: float = 0.0
+    error_rate: float = 0.0
+    requests_made: int = 0
+    consecutive_failures: int = 0
+    strikes: int = 0
+    cooldown_until: float = 0.0
+    last_used: float = 0.0
+
+    def score(self) -> float:
+        """Оценка состояния: выше - лучше"""
+        return (1.0 - self.error_rate) / (1.0 + self.latency)
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def recover(self):
+        """Сбрасывает статистику после паузы, чтобы сессию проверили заново"""
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+
+class SessionPool:
+    """Пул сессий с выбором по оценке состояния и паузой для неисправных"""
+
+    def __init__(self, size: int = 4, proxies: Optional[List[str]] = None,
+                 user_agents: Optional[List[str]] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 cooldown: float = 60.0, max_cooldown: float = 900.0,
+                 max_failures: int = 3, retries: int = 2):
+        if size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_failures = max_failures
+        self.retries = retries
+        self._lock = threading.Lock()
+
+        proxies = proxies or []
+        user_agents = user_agents or USER_AGENTS
+        self.sessions: List[PooledSession] = []
+        for i in range(size):
+            session = requests.Session()
+            session.headers.update(headers or DEFAULT_HEADERS)
+            session.headers['User-Agent'] = user_agents[i % len(user_agents)]
+            proxy = proxies[i % len(proxies)] if proxies else None
+            if proxy:
+                session.proxies.update({'http': proxy, 'https': proxy})
+            self.sessions.append(PooledSession(name=f"session-{i}", session=session, proxy=proxy))
+
+    def acquire(self) -> PooledSession:
+        """
+        Выбирает давно не использовавшуюся сессию среди исправных
+
+        Если все сессии на паузе, ждет окончания самой короткой паузы,
+        а не отправляет запрос через заблокированную сессию.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                available = []
+                for pooled in self.sessions:
+                    if not pooled.is_available(now):
+                        continue
+                    if pooled.cooldown_until:
+                        pooled.recover()
+                        logger.info(f"Сессия {pooled.name} вернулась после паузы")
+                    available.append(pooled)
+
+                if available:
+                    best = max(pooled.score() for pooled in available)
+                    healthy = [pooled for pooled in available
+                               if pooled.score() >= best * SCORE_FLOOR]
+                    chosen = min(healthy, key=lambda pooled: pooled.last_used)
+                    chosen.last_used = now
+                    return chosen
+
+                wait = min(pooled.cooldown_until for pooled in self.sessions) - now
+            # Ожидание вне блокировки, чтобы другие потоки могли сообщать результаты
+            logger.warning(f"Все сессии на паузе, ожидание {wait:.1f} с")
+            time.sleep(wait)
+
+    def report(self, pooled: PooledSession, latency: float, ok: bool, blocked: bool = False):
+        """Обновляет статистику сессии по результату запроса"""
+        with self._lock:
+            pooled.requests_made += 1
+            pooled.latency += EWMA_ALPHA * (latency - pooled.latency)
+            pooled.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - pooled.error_rate)
+
+            if ok:
+                pooled.consecutive_failures = 0
+                pooled.strikes = 0
+                return
+
+            pooled.consecutive_failures += 1
+            if blocked or pooled.consecutive_failures >= self.max_failures:
+                # Повторные паузы удлиняются вдвое
+                pooled.strikes += 1
+                pause = min(self.cooldown * 2 ** (pooled.strikes - 1), self.max_cooldown)
+                pooled.cooldown_until = time.monotonic() + pause
+                pooled.consecutive_failures = 0
+                reason = "блокировка" if blocked else "ошибки подряд"
+                logger.warning(f"Сессия {pooled.name} на паузе {pause:.0f} с ({reason})")
+
+    @staticmethod
+    def is_blocked(response: requests.Response) -> bool:
+        """Определяет, заблокирован ли запрос сайтом"""
+        if response.status_code in BLOCK_STATUSES:
+            return True
+        if CHALLENGE_PATH.search(urlsplit(response.url or '').path):
+            return True
+        return bool(CHALLENGE_TITLE.search(response.text[:4096]))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Выполняет GET-запрос через пул
+
+        При блокировке или сетевой ошибке запрос повторяется через другую
+        сессию до retries раз. Возвращает последний полученный ответ.
+        """
+        last_error = None
+        response = None
+        for _ in range(self.retries + 1):
+            pooled = self.acquire()
+            started = time.monotonic()
+            try:
+                response = pooled.session.get(url, **kwargs)
+            except requests.RequestException as e:
+                self.report(pooled, time.monotonic() - started, ok=False)
+                logger.warning(f"Ошибка запроса через {pooled.name}: {e}")
+                last_error = e
+                continue
+
+            latency = time.monotonic() - started
+            blocked = self.is_blocked(response)
+            ok = not blocked and response.status_code < 500
+            self.report(pooled, latency, ok=ok, blocked=blocked)
+            if ok:
+                return response
+            logger.warning(f"Сессия {pooled.name} получила ответ {response.status_code}"
+                           f"{' (блокировка)' if blocked else ''}")
+
+        if response is not None:
+            return response
+        raise last_error
+
+    def stats(self) -> List[Dict]:
+        """Возвращает статистику всех сессий"""
+        now = time.monotonic()
+        return [{
+            'name': pooled.name,
+            'proxy': pooled.proxy,
+            'requests': pooled.requests_made,
+            'latency': round(pooled.latency, 3),
+            'error_rate': round(pooled.error_rate, 3),
+            'score': round(pooled.score(), 3),
+            'cooldown_left': round(max(0.0, pooled.cooldown_until - now), 1),
+        } for pooled in self.sessions]
@@ -0,0 +1,145 @@
+"""
+Тесты кэша построенных графиков
+"""
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import matplotlib
+matplotlib.use('Agg')
+
+import pandas as pd
+
+from chart_cache import ChartCache, fingerprint_chart
+from price_analyzer import PriceAnalyzer
+
+
+def sample_data():
+    return pd.DataFrame({
+        'title': ['Ноутбук A', 'Ноутбук B', 'Ноутбук C'],
+        'current_price': [50000.0, 70000.0, 90000.0],
+        'old_price': [60000.0, None, 95000.0],
+        'rating': [4.5, 4.7, None],
+    })
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_depends_on_columns_data_and_params(self):
+        data = sample_data()
+        base = fingerprint_chart(data, ['title', 'current_price'], {'chart': 'a'})
+
+        self.assertEqual(base, fingerprint_chart(data.copy(), ['title', 'current_price'], {'chart': 'a'}))
+        self.assertNotEqual(base, fingerprint_chart(data, ['title', 'current_price'], {'chart': 'b'}))
+        self.assertNotEqual(base, fingerprint_chart(data, ['title', 'current_price', 'rating'], {'chart': 'a'}))
+
+        changed = data.copy()
+        changed.loc[0, 'current_price'] = 49000.0
+        self.assertNotEqual(base, fingerprint_chart(changed, ['title', 'current_price'], {'chart': 'a'}))
+        # Колонки, не влияющие на график, не меняют отпечаток
+        changed = data.copy()
+        changed['rating'] = 1.0
+        self.assertEqual(base, fingerprint_chart(changed, ['title', 'current_price'], {'chart': 'a'}))
+
+
+class ChartCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chart(self, name):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as chart:
+            chart.write(b'png')
+        return path
+
+    def test_is_fresh_checks_fingerprint_and_mtime(self):
+        cache = ChartCache(self.dir)
+        path = self.chart('a.png')
+        self.assertFalse(cache.is_fresh(path, 'f1'))
+
+        cache.store(path, 'f1')
+        self.assertTrue(cache.is_fresh(path, 'f1'))
+        self.assertFalse(cache.is_fresh(path, 'f2'))
+
+        # Файл перезаписан в обход кэша
+        mtime = os.path.getmtime(path)
+        os.utime(path, (mtime + 10, mtime + 10))
+        self.assertFalse(cache.is_fresh(path, 'f1'))
+
+        os.remove(path)
+        self.assertFalse(cache.is_fresh(path, 'f1'))
+
+    def test_save_and_reload(self):
+        path = self.chart('a.png')
+        cache = ChartCache(self.dir)
+        cache.store(path, 'f1')
+        cache.save()
+        self.assertTrue(ChartCache(self.dir).is_fresh(path, 'f1'))
+
+    def test_evicts_missing_files_and_trims_least_recently_used(self):
+        cache = ChartCache(self.dir, max_entries=2)
+        paths = [self.chart(f'{i}.png') for i in range(4)]
+        for i, path in enumerate(paths):
+            cache.store(path, f'f{i}')
+            cache.entries[path]['last_used'] = time.time() + i
+        os.remove(paths[3])
+
+        cache.evict()
+        self.assertEqual(sorted(cache.entries), sorted(paths[1:3]))
+
+    def test_corrupt_manifest_is_ignored(self):
+        with open(os.path.join(self.dir, '.chart_cache.json'), 'w') as manifest:
+            manifest.write('{not json')
+        self.assertEqual(ChartCache(self.dir).entries, {})
+
+        with open(os.path.join(self.dir, '.chart_cache.json'), 'w') as manifest:
+            json.dump(['not', 'a', 'dict'], manifest)
+        self.assertEqual(ChartCache(self.dir).entries, {})
+
+
+class CreateAllChartsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.analyzer = PriceAnalyzer(output_dir=self.tmp.name)
+        self.analyzer.data = sample_data()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render_count(self, **kwargs):
+        with mock.patch('price_analyzer.plt.savefig') as savefig:
+            savefig.side_effect = lambda path, **_: open(path, 'wb').close()
+            charts = self.analyzer.create_all_charts(**kwargs)
+        self.assertEqual(len(charts), 4)
+        return savefig.call_count
+
+    def test_unchanged_charts_are_skipped(self):
+        self.assertEqual(self.render_count(), 4)
+        self.assertEqual(self.render_count(), 0)
+
+        self.analyzer.data.loc[0, 'rating'] = 3.0
+        # Рейтинг используется графиком рейтингов и сводным отчетом
+        self.assertEqual(self.render_count(), 2)
+
+    def test_parameter_change_rebuilds(self):
+        self.render_count()
+        self.analyzer.scatter_mode = 'sample'
+        self.assertEqual(self.render_count(), 4)
+
+    def test_forced_rebuild_updates_manifest(self):
+        self.render_count()
+        self.assertEqual(self.render_count(use_cache=False), 4)
+        self.assertEqual(self.render_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
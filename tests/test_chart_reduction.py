@@ -0,0 +1,117 @@
+"""
+Тесты сокращения данных для графиков
+"""
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from matplotlib import cbook
+
+from chart_reduction import (
+    reduce_boxplot, reduce_histogram, stratified_sample, top_and_bottom_k,
+    top_k_indices
+)
+from price_analyzer import PriceAnalyzer
+
+
+class TopKTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def assert_matches_pandas(self, values, k=10):
+        series = pd.Series(values)
+        expected_top = list(series.nlargest(k, keep='first').index)
+        expected_bottom = list(series.nsmallest(k, keep='first').index)
+
+        self.assertEqual(list(top_k_indices(values, k)), expected_top)
+        self.assertEqual(list(top_k_indices(values, k, largest=False)), expected_bottom)
+        top, bottom = top_and_bottom_k(values, k)
+        self.assertEqual(list(top), expected_top)
+        self.assertEqual(list(bottom), expected_bottom)
+
+    def test_ties_match_pandas_when_n_at_most_2k(self):
+        for n in range(11, 21):
+            for _ in range(10):
+                self.assert_matches_pandas(self.rng.integers(0, 4, n).astype(float))
+
+    def test_ties_match_pandas_when_n_above_2k(self):
+        for n in (21, 100, 1000):
+            for _ in range(10):
+                self.assert_matches_pandas(self.rng.integers(0, 5, n).astype(float))
+
+    def test_all_equal_values(self):
+        self.assert_matches_pandas(np.full(50, 7.0))
+
+    def test_short_input(self):
+        self.assertEqual(list(top_k_indices([3.0, 1.0, 2.0], 10)), [0, 2, 1])
+        self.assertEqual(list(top_k_indices([], 10)), [])
+
+    def test_rows_with_gaps_match_nlargest(self):
+        values = self.rng.integers(0, 5, 200).astype(float)
+        values[self.rng.random(200) < 0.3] = np.nan
+        frame = pd.DataFrame({'title': [f't{i}' for i in range(200)], 'price': values})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = PriceAnalyzer(output_dir=tmp)
+            top = analyzer._top_rows(frame, 'price')
+            bottom = analyzer._top_rows(frame, 'price', largest=False)
+
+        self.assertEqual(list(top.index), list(frame.nlargest(10, 'price').index))
+        self.assertEqual(list(bottom.index), list(frame.nsmallest(10, 'price').index))
+
+
+class StratifiedSampleTest(unittest.TestCase):
+
+    def test_size_never_exceeds_max_points(self):
+        rng = np.random.default_rng(1)
+        for n in (5001, 12345, 100000):
+            sample = stratified_sample(rng.lognormal(size=n), 5000)
+            self.assertLessEqual(len(sample), 5000)
+            self.assertEqual(len(np.unique(sample)), len(sample))
+
+    def test_all_equal_values(self):
+        sample = stratified_sample(np.ones(10000), 1000)
+        self.assertLessEqual(len(sample), 1000)
+        self.assertGreater(len(sample), 0)
+
+    def test_small_input_is_returned_whole(self):
+        self.assertEqual(list(stratified_sample([3.0, 1.0, 2.0], 10)), [0, 1, 2])
+
+    def test_every_quantile_band_is_represented(self):
+        values = np.random.default_rng(3).lognormal(size=100000)
+        sample = values[stratified_sample(values, 200, strata=50)]
+        edges = np.quantile(values, np.linspace(0, 1, 51))
+        bands = np.clip(np.searchsorted(edges, sample, side='right') - 1, 0, 49)
+        self.assertEqual(len(np.unique(bands)), 50)
+
+
+class ReduceTest(unittest.TestCase):
+
+    def test_histogram_ignores_gaps(self):
+        counts, edges = reduce_histogram([1.0, 2.0, np.nan, 3.0], bins=3)
+        self.assertEqual(counts.sum(), 3)
+        self.assertEqual(len(edges), 4)
+
+    def test_boxplot_matches_matplotlib(self):
+        values = np.concatenate([np.arange(1.0, 101.0), [500.0, 600.0, -300.0], [np.nan]])
+        expected = cbook.boxplot_stats(values[~np.isnan(values)])[0]
+        stats = reduce_boxplot(values)
+        for key in ('med', 'q1', 'q3', 'whislo', 'whishi'):
+            self.assertAlmostEqual(stats[key], expected[key])
+        self.assertEqual(sorted(stats['fliers']), sorted(expected['fliers']))
+
+    def test_boxplot_thins_fliers(self):
+        rng = np.random.default_rng(2)
+        values = np.concatenate([rng.normal(size=10000), rng.uniform(100, 200, 1000)])
+        stats = reduce_boxplot(values, max_fliers=50)
+        outliers = values[values > stats['q3'] + 1.5 * (stats['q3'] - stats['q1'])]
+
+        self.assertEqual(len(stats['fliers']), 50)
+        self.assertEqual(stats['fliers'][-1], outliers.max())
+        self.assertTrue(np.all(np.diff(stats['fliers']) >= 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Тесты правил уведомлений о ценах
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from price_alerts import AlertEngine, AlertRule, OutboxSink, WebhookSink
+
+
+def product(price, old_price=None, product_id='1', category='ноутбуки'):
+    return {
+        'product_id': product_id,
+        'category': category,
+        'title': 'Ноутбук',
+        'current_price': price,
+        'old_price': old_price,
+        'rating': 4.5,
+    }
+
+
+class AlertEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp.name, 'state.json')
+        self.rules = [
+            AlertRule('cheap', 'price_below', 100, category='ноутбуки'),
+            AlertRule('low', 'all_time_low', product_id='1'),
+            AlertRule('sale', 'discount_above', 30),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def engine(self):
+        return AlertEngine(self.rules, state_path=self.state_path)
+
+    def fired(self, engine, *products):
+        return sorted(alert['rule_id'] for alert in engine.evaluate(products))
+
+    def test_fires_on_transition_only(self):
+        engine = self.engine()
+        self.assertEqual(self.fired(engine, product(150)), [])
+        self.assertEqual(self.fired(engine, product(90)), ['cheap', 'low'])
+        # Цена осталась ниже порога, но нового минимума нет
+        self.assertEqual(self.fired(engine, product(95)), [])
+        self.assertEqual(self.fired(engine, product(120)), [])
+        self.assertEqual(self.fired(engine, product(99)), ['cheap'])
+
+    def test_refires_on_new_all_time_low(self):
+        engine = self.engine()
+        self.fired(engine, product(500))
+        self.assertEqual(self.fired(engine, product(400)), ['low'])
+        self.assertEqual(self.fired(engine, product(300)), ['low'])
+        self.assertEqual(self.fired(engine, product(300)), [])
+
+    def test_discount_above(self):
+        engine = self.engine()
+        self.assertEqual(self.fired(engine, product(800, old_price=1000)), [])
+        self.assertEqual(self.fired(engine, product(600, old_price=1000)), ['low', 'sale'])
+
+    def test_rules_indexed_by_product_and_category(self):
+        engine = self.engine()
+        other = product(50, product_id='2', category='смартфоны')
+        self.assertEqual(self.fired(engine, other), [])
+
+    def test_state_is_saved_and_reloaded(self):
+        engine = self.engine()
+        self.fired(engine, product(200), product(90, product_id='2'))
+        engine.save_state()
+
+        reloaded = self.engine()
+        self.assertEqual(reloaded.min_prices, {'1': 200, '2': 90})
+        # cheap для товара 2 уже сработал в прошлом запуске
+        self.assertEqual(self.fired(reloaded, product(80, product_id='2')), [])
+        self.assertEqual(self.fired(reloaded, product(150)), ['low'])
+
+    def test_rule_requires_threshold(self):
+        with self.assertRaises(ValueError):
+            AlertRule('bad', 'price_below')
+        with self.assertRaises(ValueError):
+            AlertRule('bad', 'unknown', 10)
+
+    def test_threshold_is_converted_at_load(self):
+        rules_path = os.path.join(self.tmp.name, 'rules.json')
+        with open(rules_path, 'w', encoding='utf-8') as rules_file:
+            json.dump([{'rule_id': 'cheap', 'kind': 'price_below', 'threshold': '50000'}], rules_file)
+        engine = AlertEngine.from_file(rules_path, state_path=None)
+        self.assertEqual(engine.global_rules[0].threshold, 50000.0)
+
+        with self.assertRaises(ValueError):
+            AlertRule('bad', 'price_below', 'дешево')
+        with self.assertRaises(ValueError):
+            AlertRule('bad', 'discount_above', [10])
+
+    def test_rule_cannot_target_product_and_category(self):
+        with self.assertRaises(ValueError):
+            AlertRule('bad', 'price_below', 100, product_id='1', category='ноутбуки')
+
+    def test_state_drops_removed_rules(self):
+        engine = self.engine()
+        self.fired(engine, product(500), product(90))
+        engine.save_state()
+
+        self.rules = [rule for rule in self.rules if rule.rule_id != 'cheap']
+        reloaded = self.engine()
+        reloaded.save_state()
+        self.assertEqual(reloaded.active, {('low', '1')})
+        with open(self.state_path, encoding='utf-8') as state_file:
+            self.assertEqual(json.load(state_file)['active'], [['low', '1']])
+
+
+class OutboxSinkTest(unittest.TestCase):
+
+    def test_appends_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'outbox.jsonl')
+            sink = OutboxSink(path)
+            sink.send([{'rule_id': 'a', 'title': 'Ноутбук'}])
+            sink.send([])
+            sink.send([{'rule_id': 'b'}])
+            with open(path, encoding='utf-8') as outbox:
+                lines = [json.loads(line) for line in outbox]
+        self.assertEqual(lines, [{'rule_id': 'a', 'title': 'Ноутбук'}, {'rule_id': 'b'}])
+
+
+class WebhookSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.status = 204
+        test = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if test.status < 400:
+                    test.received.append(json.loads(body))
+                self.send_response(test.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/alerts'
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue_path = os.path.join(self.tmp.name, 'queue.jsonl')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_delivers_alerts(self):
+        WebhookSink(self.url, queue_path=self.queue_path).send([{'rule_id': 'a'}, {'rule_id': 'b'}])
+        self.assertEqual(self.received, [{'rule_id': 'a'}, {'rule_id': 'b'}])
+
+    def test_undelivered_alerts_survive_restart(self):
+        self.status = 503
+        WebhookSink(self.url, queue_path=self.queue_path).send([{'rule_id': 'a'}])
+        self.assertEqual(self.received, [])
+
+        # Новый экземпляр, как при следующем запуске, дочитывает очередь
+        self.status = 204
+        sink = WebhookSink(self.url, queue_path=self.queue_path)
+        sink.send([{'rule_id': 'b'}])
+        self.assertEqual(self.received, [{'rule_id': 'a'}, {'rule_id': 'b'}])
+        self.assertEqual(sink.pending, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Тесты индекса и HTTP API
+"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import quote
+
+import pandas as pd
+
+from price_api import PriceApiServer, PriceIndex
+
+COLUMNS = ['product_id', 'category', 'title', 'current_price', 'old_price',
+           'rating', 'url', 'date_collected']
+
+
+def write_collection(directory, stamp, rows):
+    """Сохраняет сбор в файл ozon_products_<stamp>.csv"""
+    path = os.path.join(directory, f"ozon_products_{stamp}.csv")
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return path
+
+
+def row(product_id, price, category='ноутбуки', title='Ноутбук', url=None,
+        date='2024-01-01 12:00:00'):
+    return [product_id, category, title, price, None, 4.5, url, date]
+
+
+class PriceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = PriceIndex(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_product_id_falls_back_to_url_and_title(self):
+        write_collection(self.tmp.name, '20240101_120000', [
+            row(None, 100, url='https://www.ozon.ru/product/noutbuk-123456/'),
+            row(None, 200, title='Без ссылки'),
+            row(None, 300, title=None),
+        ])
+        self.index.refresh()
+
+        ids = [item['product_id'] for item in self.index.state.snapshot]
+        self.assertEqual(ids, ['123456', 'Без ссылки'])
+        self.assertNotIn('nan', self.index.state.history)
+
+    def test_snapshot_keeps_last_record_across_files(self):
+        write_collection(self.tmp.name, '20240101_120000', [
+            row('1', 100, category='ноутбуки'), row('2', 200, category='ноутбуки')])
+        write_collection(self.tmp.name, '20240102_120000', [
+            row('1', 90, category='ноутбуки', date='2024-01-02 12:00:00'),
+            row('3', 50, category='мыши')])
+        self.index.refresh()
+
+        snapshot = {item['product_id']: item['current_price'] for item in self.index.state.snapshot}
+        self.assertEqual(snapshot, {'1': 90, '2': 200, '3': 50})
+        self.assertEqual([record['current_price'] for record in self.index.state.history['1']],
+                         [100, 90])
+
+    def test_statistics_per_category(self):
+        write_collection(self.tmp.name, '20240101_120000', [
+            row('1', 100), row('2', 300), row('3', 50, category='all')])
+        self.index.refresh()
+
+        statistics = self.index.state.statistics
+        self.assertEqual(set(statistics['categories']), {'ноутбуки', 'all'})
+        self.assertEqual(statistics['categories']['ноутбуки']['current_price']['mean'], 200)
+        self.assertEqual(statistics['categories']['all']['current_price']['mean'], 50)
+        self.assertEqual(statistics['overall']['current_price']['mean'], 150)
+
+    def test_rebuilds_on_new_file(self):
+        write_collection(self.tmp.name, '20240101_120000', [row('1', 100)])
+        self.assertTrue(self.index.refresh())
+        version = self.index.state.version
+        self.assertFalse(self.index.refresh())
+
+        write_collection(self.tmp.name, '20240102_120000', [row('2', 200)])
+        self.assertTrue(self.index.refresh())
+        self.assertNotEqual(self.index.state.version, version)
+        self.assertEqual(len(self.index.state.snapshot), 2)
+
+    def test_retries_file_after_read_failure(self):
+        write_collection(self.tmp.name, '20240101_120000', [row('1', 100)])
+        read = self.index._read
+        with mock.patch.object(self.index, '_read', side_effect=OSError('занят')):
+            self.index.refresh()
+        self.assertEqual(self.index.state.snapshot, [])
+
+        with mock.patch.object(self.index, '_read', side_effect=read) as patched:
+            self.assertTrue(self.index.refresh())
+        patched.assert_called_once()
+        self.assertEqual(len(self.index.state.snapshot), 1)
+
+
+class PriceApiServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_collection(self.tmp.name, '20240101_120000', [
+            row(str(i), 100 + i, category='ноутбуки' if i % 2 else 'мыши') for i in range(10)])
+        self.server = PriceApiServer(PriceIndex(self.tmp.name), port=0,
+                                     reload_interval=60, read_timeout=0.5)
+        await self.server.start()
+        self.port = self.server._server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.stop()
+        self.tmp.cleanup()
+
+    async def send(self, raw: str):
+        """Отправляет запрос и возвращает статус, заголовки и тело ответа"""
+        self.writer.write(raw.encode('utf-8'))
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.lower()] = value.strip()
+        body = await self.reader.readexactly(int(headers['content-length']))
+        return status, headers, json.loads(body) if body else None
+
+    async def get(self, path: str, **headers):
+        lines = [f"GET {path} HTTP/1.1", "Host: localhost"]
+        lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+        return await self.send("\r\n".join(lines) + "\r\n\r\n")
+
+    async def test_statistics_for_category(self):
+        status, _, payload = await self.get(f"/statistics?category={quote('мыши')}")
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['category'], 'мыши')
+        self.assertEqual(payload['statistics']['current_price']['count'], 5)
+
+        status, _, payload = await self.get('/statistics')
+        self.assertEqual(status, 200)
+        self.assertEqual(set(payload['categories']), {'ноутбуки', 'мыши'})
+        self.assertEqual(payload['overall']['current_price']['count'], 10)
+
+        status, _, _ = await self.get(f"/statistics?category={quote('планшеты')}")
+        self.assertEqual(status, 404)
+
+    async def test_pagination_validation(self):
+        status, _, payload = await self.get('/snapshot?offset=8&limit=5')
+        self.assertEqual(status, 200)
+        self.assertEqual((payload['total'], len(payload['items'])), (10, 2))
+
+        for query in ('offset=-1', 'limit=0', 'limit=abc'):
+            status, _, _ = await self.get(f'/snapshot?{query}')
+            self.assertEqual(status, 400, query)
+
+    async def test_not_modified_for_matching_etag(self):
+        status, headers, _ = await self.get('/snapshot')
+        self.assertEqual(status, 200)
+        status, _, body = await self.get('/snapshot', if_none_match=headers['etag'])
+        self.assertEqual(status, 304)
+        self.assertIsNone(body)
+
+    async def test_malformed_content_length_returns_400(self):
+        status, headers, _ = await self.send(
+            "GET /health HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        self.assertEqual(status, 400)
+        self.assertEqual(headers['connection'], 'close')
+        self.assertEqual(await self.reader.read(), b'')
+
+    async def test_unexpected_error_returns_500(self):
+        with mock.patch.object(self.server, '_route', side_effect=RuntimeError('сбой')):
+            status, _, payload = await self.get('/snapshot')
+        self.assertEqual(status, 500)
+        self.assertIn('error', payload)
+        # Соединение остается рабочим
+        status, _, _ = await self.get('/health')
+        self.assertEqual(status, 200)
+
+    async def test_idle_connection_is_closed(self):
+        self.assertEqual(await asyncio.wait_for(self.reader.read(), 5), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
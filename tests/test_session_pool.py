@@ -0,0 +1,127 @@
+"""
+Тесты пула HTTP-сессий с локальными прокси-заглушками
+"""
+import socket
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from session_pool import SessionPool
+
+TARGET_URL = 'http://ozon.test/search/?text=ноутбуки'
+NORMAL_PAGE = (b'<html><head><title>Ozon</title>'
+               b'<script src="https://www.google.com/recaptcha/api.js"></script>'
+               b'</head><body>ok</body></html>')
+CHALLENGE_PAGE = b'<html><head><title>Antibot Challenge Page</title></head></html>'
+
+
+def start_proxy(status=200, body=NORMAL_PAGE):
+    """Запускает прокси-заглушку, отвечающую на любой запрос"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def refused_proxy():
+    """Возвращает адрес порта, на котором никто не слушает"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def proxy(self, status=200, body=NORMAL_PAGE):
+        server, url = start_proxy(status, body)
+        self.servers.append(server)
+        return url
+
+    def get_many(self, pool, count):
+        return [pool.get(TARGET_URL, timeout=2).status_code for _ in range(count)]
+
+    def test_unhealthy_sessions_go_on_cooldown(self):
+        pool = SessionPool(size=4, cooldown=30, max_failures=1, proxies=[
+            self.proxy(200), self.proxy(429), refused_proxy(), self.proxy(200),
+        ])
+        self.assertEqual(self.get_many(pool, 20), [200] * 20)
+
+        stats = {item['name']: item for item in pool.stats()}
+        self.assertGreater(stats['session-1']['cooldown_left'], 0)
+        self.assertGreater(stats['session-2']['cooldown_left'], 0)
+        self.assertEqual(stats['session-0']['cooldown_left'], 0)
+        self.assertEqual(stats['session-3']['cooldown_left'], 0)
+
+    def test_load_is_spread_across_healthy_sessions(self):
+        pool = SessionPool(size=3, cooldown=30, max_failures=1, proxies=[
+            self.proxy(200), self.proxy(429), self.proxy(200),
+        ])
+        self.get_many(pool, 20)
+
+        used = Counter({item['name']: item['requests'] for item in pool.stats()})
+        self.assertEqual(used['session-1'], 1)
+        self.assertGreaterEqual(used['session-0'], 9)
+        self.assertGreaterEqual(used['session-2'], 9)
+
+    def test_session_is_probed_again_after_cooldown(self):
+        pool = SessionPool(size=2, cooldown=0.2, max_failures=1, proxies=[
+            self.proxy(200), self.proxy(429),
+        ])
+        self.get_many(pool, 3)
+        blocked = pool.sessions[1]
+        self.assertEqual(blocked.requests_made, 1)
+
+        time.sleep(0.3)
+        self.get_many(pool, 4)
+        self.assertEqual(blocked.requests_made, 2)
+
+    def test_waits_when_all_sessions_are_on_cooldown(self):
+        pool = SessionPool(size=2, cooldown=0.5, retries=2,
+                           proxies=[self.proxy(429), self.proxy(429)])
+        started = time.monotonic()
+        self.assertEqual(pool.get(TARGET_URL, timeout=2).status_code, 429)
+
+        # Третья попытка ждет окончания паузы первой сессии
+        self.assertGreaterEqual(time.monotonic() - started, 0.5)
+        self.assertEqual([pooled.requests_made for pooled in pool.sessions], [2, 1])
+
+    def test_refused_connections_raise_after_retries(self):
+        pool = SessionPool(size=2, retries=1, proxies=[refused_proxy(), refused_proxy()])
+        with self.assertRaises(requests.RequestException):
+            pool.get(TARGET_URL, timeout=2)
+
+    def test_block_detection(self):
+        pool = SessionPool(size=2, cooldown=30, proxies=[
+            self.proxy(200, NORMAL_PAGE), self.proxy(200, CHALLENGE_PAGE),
+        ])
+        self.get_many(pool, 4)
+
+        normal, challenge = pool.sessions
+        self.assertEqual(normal.cooldown_until, 0.0)
+        self.assertGreater(challenge.cooldown_until, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()